@@ -0,0 +1,985 @@
+"""Asyncio load simulator for the messaging and notification realtime path.
+
+Simulates N concurrent users against a bundled stand-in server that mirrors
+the schema from create_messaging_system.sql / create_notification_system.sql,
+the RLS policies on those tables, the contact request notification trigger
+(MASTER_FIX_NOTIFICATIONS_FINAL.sql) and the realtime publication from
+ENABLE_REALTIME.sql. Each simulated user follows what the frontend does:
+
+  * App.tsx subscribes to `realtime-notifications` (notifications, user_id=eq.me),
+    `realtime-requests` (contact_requests, target_user_id=eq.me) and
+    `realtime-chat-global` (every INSERT on messages, no filter).
+  * Opening a chat inserts a conversation and falls back to a select on 23505.
+  * MessagesModal subscribes to `chat:<id>`, fetches and marks messages as read,
+    sends by inserting a message and updating the conversation's last_message,
+    and refreshes the conversation list without waiting for it.
+  * Incoming realtime events trigger the same refetches the UI does, replaying
+    the query sequence of fetchConversations (list, per-conversation
+    last_message backfill, profiles/cvs/companies/shops, unread count) and
+    fetchGeneralNotifications (list, request statuses, companies/cvs).
+
+Like Supabase Realtime, unfiltered subscriptions are authorised per subscriber
+against RLS, so the report shows both the authorisation checks and the actual
+deliveries each change event costs.
+
+Usage:
+    python simulate_messaging_load.py --users 2000 --messages 20 --json run.json
+    python simulate_messaging_load.py --users 2000 --compare run.json
+    python simulate_messaging_load.py --serve --port 8765          # server only
+    python simulate_messaging_load.py --server 127.0.0.1:8765      # clients only
+
+Delivery latencies use time.monotonic() stamps from the server, so server and
+clients must run on the same host.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+STREAM_LIMIT = 2 ** 22
+EMPLOYER_SHARE = 0.2
+FD_LIMIT = 10240
+SETTLE_QUIET_SECONDS = 0.05
+
+# Tables added to the supabase_realtime publication. ENABLE_REALTIME.sql adds
+# messages and conversations; App.tsx also listens on notifications and
+# contact_requests, which only works when those are published too.
+REALTIME_TABLES = ("messages", "conversations", "notifications", "contact_requests")
+
+# Publicly readable tables the UI joins in for names and avatars, keyed by the
+# column the frontend looks them up with (`.in(<column>, ids)`).
+DIRECTORY_TABLES = {"profiles": "id", "cvs": "user_id", "companies": "user_id", "shops": "user_id"}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list, None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(values, scale=1000.0):
+    """p50/p95/p99/mean/max of a sample, scaled (seconds -> ms by default)."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values) * scale, 3),
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p95": round(percentile(values, 95) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values) * scale, 3),
+    }
+
+
+class DatabaseError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+# ---------------------------------------------------------------------------
+# Stand-in server
+# ---------------------------------------------------------------------------
+
+class Subscription:
+    __slots__ = ("connection", "topic", "table", "event", "filter_column", "filter_value")
+
+    def __init__(self, connection, topic, table, event, filter_column, filter_value):
+        self.connection = connection
+        self.topic = topic
+        self.table = table
+        self.event = event
+        self.filter_column = filter_column
+        self.filter_value = filter_value
+
+
+class Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.user_id = None
+        self.subscriptions = {}
+
+    def send(self, message):
+        data = (json.dumps(message, separators=(",", ":")) + "\n").encode()
+        if not self.writer.is_closing():
+            self.writer.write(data)
+        return len(data)
+
+
+class StandInServer:
+    """In-memory stand-in for Postgres + PostgREST + Realtime.
+
+    Speaks newline-delimited JSON over TCP. Only the tables, constraints and
+    policies the messaging/notification flows touch are modelled.
+    """
+
+    def __init__(self, delay_ms=0.0):
+        self.delay = delay_ms / 1000.0
+        self.reset()
+
+    def reset(self):
+        self.tables = {name: {} for name in REALTIME_TABLES + tuple(DIRECTORY_TABLES)}
+        self.conversation_pairs = {}
+        self.contact_request_pairs = {}
+        self.messages_by_conversation = defaultdict(list)
+        self.conversations_by_user = defaultdict(set)
+        self.notifications_by_user = defaultdict(list)
+        # table -> None (unfiltered) | column -> value -> [Subscription]
+        self.unfiltered = defaultdict(list)
+        self.filtered = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.fanout = defaultdict(lambda: {"events": 0, "checks": [], "deliveries": [],
+                                           "bytes": [], "seconds": []})
+        self.requests = 0
+
+    # -- RLS ---------------------------------------------------------------
+
+    def is_participant(self, conversation_id, user_id):
+        conversation = self.tables["conversations"].get(conversation_id)
+        return conversation is not None and user_id in (
+            conversation["participant1_id"], conversation["participant2_id"])
+
+    def can_select(self, table, row, user_id):
+        if table == "messages":
+            return self.is_participant(row["conversation_id"], user_id)
+        if table == "conversations":
+            return user_id in (row["participant1_id"], row["participant2_id"])
+        if table == "notifications":
+            return row["user_id"] == user_id
+        if table == "contact_requests":
+            return user_id in (row["requester_id"], row["target_user_id"])
+        return table in DIRECTORY_TABLES
+
+    # -- Realtime ----------------------------------------------------------
+
+    def subscribe(self, connection, topic, table, event, filter_spec):
+        if table not in REALTIME_TABLES:
+            raise DatabaseError("42P01", f'relation "public.{table}" is not published')
+        self.unsubscribe(connection, topic)
+        column = value = None
+        if filter_spec:
+            column, _, value = filter_spec.partition("=eq.")
+        subscription = Subscription(connection, topic, table, event, column, value)
+        if column:
+            self.filtered[table][column][value].append(subscription)
+        else:
+            self.unfiltered[table].append(subscription)
+        connection.subscriptions[topic] = subscription
+
+    def unsubscribe(self, connection, topic):
+        subscription = connection.subscriptions.pop(topic, None)
+        if subscription is None:
+            return
+        if subscription.filter_column:
+            bucket = self.filtered[subscription.table][subscription.filter_column][subscription.filter_value]
+        else:
+            bucket = self.unfiltered[subscription.table]
+        bucket.remove(subscription)
+
+    def drop_connection(self, connection):
+        for topic in list(connection.subscriptions):
+            self.unsubscribe(connection, topic)
+
+    def publish(self, table, change_type, record):
+        """Fan a committed change out to every matching subscription."""
+        started = time.perf_counter()
+        candidates = list(self.unfiltered.get(table, ()))
+        for column, by_value in self.filtered.get(table, {}).items():
+            candidates.extend(by_value.get(str(record.get(column)), ()))
+
+        checks = deliveries = sent_bytes = 0
+        message = None
+        for subscription in candidates:
+            if subscription.event not in ("*", change_type):
+                continue
+            # Realtime authorises each subscriber against RLS before delivery.
+            checks += 1
+            if not self.can_select(table, record, subscription.connection.user_id):
+                continue
+            if message is None:
+                message = {"event": "postgres_changes", "table": table, "type": change_type,
+                           "new": record, "commit_ts": time.monotonic()}
+            message["topic"] = subscription.topic
+            sent_bytes += subscription.connection.send(message)
+            deliveries += 1
+
+        stats = self.fanout[f"{table}.{change_type}"]
+        stats["events"] += 1
+        stats["checks"].append(checks)
+        stats["deliveries"].append(deliveries)
+        stats["bytes"].append(sent_bytes)
+        stats["seconds"].append(time.perf_counter() - started)
+
+    # -- Queries -----------------------------------------------------------
+
+    def insert(self, user_id, table, values):
+        row = dict(values)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", now_iso())
+
+        if table == "conversations":
+            if user_id not in (row["participant1_id"], row["participant2_id"]):
+                raise DatabaseError("42501", "new row violates row-level security policy")
+            pair = (row["participant1_id"], row["participant2_id"])
+            if pair in self.conversation_pairs:
+                raise DatabaseError("23505", "duplicate key value violates unique constraint "
+                                    '"conversations_participant1_id_participant2_id_key"')
+            row.setdefault("last_message", None)
+            row.setdefault("last_message_at", row["created_at"])
+            self.conversation_pairs[pair] = row["id"]
+            self.conversations_by_user[pair[0]].add(row["id"])
+            self.conversations_by_user[pair[1]].add(row["id"])
+        elif table == "messages":
+            if row.get("sender_id") != user_id or not self.is_participant(row["conversation_id"], user_id):
+                raise DatabaseError("42501", "new row violates row-level security policy")
+            row.setdefault("is_read", False)
+            self.messages_by_conversation[row["conversation_id"]].append(row)
+        elif table == "contact_requests":
+            if row.get("requester_id") != user_id or row.get("target_user_id") == user_id:
+                raise DatabaseError("42501", "new row violates row-level security policy")
+            pair = (row["requester_id"], row["target_user_id"])
+            if pair in self.contact_request_pairs:
+                raise DatabaseError("23505", "duplicate key value violates unique constraint "
+                                    '"contact_requests_requester_id_target_user_id_key"')
+            row.setdefault("status", "pending")
+            self.contact_request_pairs[pair] = row["id"]
+        elif table == "notifications":
+            row.setdefault("is_read", False)
+            row.setdefault("is_visible", True)
+            self.notifications_by_user[row["user_id"]].append(row)
+        else:
+            raise DatabaseError("42P01", f'relation "public.{table}" does not exist')
+
+        self.tables[table][row["id"]] = row
+        self.publish(table, "INSERT", row)
+        if table == "contact_requests":
+            self.contact_request_trigger("INSERT", None, row)
+        return row
+
+    def register(self, user_id, role):
+        """Seed the profile and cv/company row a signed-up user would have."""
+        name = f"Kullanıcı {user_id[:8]}"
+        self.tables["profiles"][user_id] = {"id": user_id, "full_name": name, "role": role, "avatar_url": None}
+        if role == "employer":
+            self.tables["companies"][user_id] = {"user_id": user_id, "company_name": name,
+                                                 "logo_url": None, "industry": "Bilişim"}
+        else:
+            self.tables["cvs"][user_id] = {"user_id": user_id, "name": name, "photo_url": None,
+                                           "profession": "Yazılım Geliştirici"}
+
+    def matches(self, row, eq, neq, within):
+        return (all(row.get(k) == v for k, v in eq.items())
+                and all(row.get(k) != v for k, v in neq.items())
+                and all(row.get(k) in v for k, v in within.items()))
+
+    def candidate_rows(self, user_id, table, eq, within):
+        if table in DIRECTORY_TABLES:
+            key = DIRECTORY_TABLES[table]
+            if key in within:
+                rows = self.tables[table]
+                return [rows[value] for value in within[key] if value in rows]
+            return self.tables[table].values()
+        if table == "messages" and "conversation_id" in eq:
+            return self.messages_by_conversation.get(eq["conversation_id"], ())
+        if table == "messages":
+            # RLS limits an unscoped messages query to the user's conversations.
+            return [row for cid in self.conversations_by_user.get(user_id, ())
+                    for row in self.messages_by_conversation.get(cid, ())]
+        if table == "conversations":
+            return [self.tables["conversations"][cid] for cid in self.conversations_by_user.get(user_id, ())]
+        if table == "notifications":
+            return self.notifications_by_user.get(user_id, ())
+        if table == "contact_requests" and ("id" in eq or "id" in within):
+            rows = self.tables["contact_requests"]
+            ids = [eq["id"]] if "id" in eq else within["id"]
+            return [rows[value] for value in ids if value in rows]
+        return self.tables[table].values()
+
+    def select(self, user_id, table, eq, neq, within=None, participant=None,
+               order=None, descending=False, limit=None, count=False):
+        within = {key: set(values) for key, values in (within or {}).items()}
+        rows = [row for row in self.candidate_rows(user_id, table, eq, within)
+                if self.matches(row, eq, neq, within) and self.can_select(table, row, user_id)]
+        if participant is not None:
+            rows = [row for row in rows if participant in (row["participant1_id"], row["participant2_id"])]
+        if count:
+            return len(rows)
+        if order:
+            rows.sort(key=lambda row: row[order] or "", reverse=descending)
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    def update(self, user_id, table, eq, neq, values):
+        if table == "conversations":
+            # create_messaging_system.sql has no UPDATE policy on conversations,
+            # so under RLS the last_message update matches no rows.
+            return 0
+        changed = []
+        for row in self.select(user_id, table, eq, neq):
+            if table == "contact_requests" and row["target_user_id"] != user_id:
+                continue
+            old = dict(row)
+            row.update(values)
+            changed.append(row)
+            self.publish(table, "UPDATE", row)
+            if table == "contact_requests":
+                self.contact_request_trigger("UPDATE", old, row)
+        return len(changed)
+
+    def contact_request_trigger(self, operation, old, new):
+        """handle_contact_request_events(): notify the other side of a request."""
+        if operation == "INSERT":
+            receiver, sender, kind = new["target_user_id"], new["requester_id"], "contact_request"
+            title = "İletişim İsteği"
+        elif old["status"] == "pending" and new["status"] in ("approved", "rejected"):
+            receiver, sender = new["requester_id"], new["target_user_id"]
+            kind = "success" if new["status"] == "approved" else "info"
+            title = "İletişim İsteği Onaylandı" if new["status"] == "approved" else "İstek Sonuçlandı"
+        else:
+            return
+        self.insert(None, "notifications", {
+            "user_id": receiver, "sender_id": sender, "type": kind, "title": title,
+            "message": "Bir kullanıcı", "related_id": new["id"], "is_read": False,
+        })
+
+    def stats(self):
+        tables = {}
+        for key, stats in sorted(self.fanout.items()):
+            tables[key] = {
+                "events": stats["events"],
+                "authorization_checks_per_event": summarize(stats["checks"], scale=1),
+                "deliveries_per_event": summarize(stats["deliveries"], scale=1),
+                "bytes_per_event": summarize(stats["bytes"], scale=1),
+                "fanout_us_per_event": summarize(stats["seconds"], scale=1e6),
+            }
+        return {"requests": self.requests, "fanout": tables,
+                "rows": {name: len(rows) for name, rows in self.tables.items()}}
+
+    # -- Transport ---------------------------------------------------------
+
+    def dispatch(self, connection, request):
+        op = request["op"]
+        if op == "auth":
+            connection.user_id = request["user_id"]
+            self.register(request["user_id"], request.get("role", "job_seeker"))
+            return None
+        if op == "subscribe":
+            self.subscribe(connection, request["topic"], request["table"],
+                           request.get("event", "*"), request.get("filter"))
+            return None
+        if op == "unsubscribe":
+            self.unsubscribe(connection, request["topic"])
+            return None
+        if op == "insert":
+            return self.insert(connection.user_id, request["table"], request["values"])
+        if op == "select":
+            return self.select(connection.user_id, request["table"], request.get("eq", {}),
+                               request.get("neq", {}), request.get("in"), request.get("participant"),
+                               request.get("order"), request.get("desc", False), request.get("limit"),
+                               request.get("count", False))
+        if op == "update":
+            return self.update(connection.user_id, request["table"], request.get("eq", {}),
+                               request.get("neq", {}), request["values"])
+        if op == "stats":
+            return self.stats()
+        if op == "reset":
+            self.reset()
+            return None
+        raise DatabaseError("PGRST000", f"unknown op {op!r}")
+
+    async def handle(self, reader, writer):
+        connection = Connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                try:
+                    reply = {"ref": request["ref"], "data": self.dispatch(connection, request)}
+                except DatabaseError as error:
+                    reply = {"ref": request["ref"], "error": {"code": error.code, "message": error.message}}
+                connection.send(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.drop_connection(connection)
+            writer.close()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.handle, host, port, limit=STREAM_LIMIT, backlog=4096)
+
+
+# ---------------------------------------------------------------------------
+# Simulated users
+# ---------------------------------------------------------------------------
+
+class Metrics:
+    def __init__(self):
+        # latencies: one entry per server round trip; flows: whole UI actions
+        # (e.g. fetch_conversations) spanning several round trips.
+        self.reset()
+
+    def reset(self):
+        self.latencies = defaultdict(list)
+        self.flows = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.deliveries = defaultdict(list)
+        self.counters = defaultdict(int)
+        # Last reply or realtime event seen by any client, for the run clock.
+        self.last_activity = time.perf_counter()
+
+
+class RealtimeClient:
+    """Minimal client for the stand-in server, shaped after supabase-js calls."""
+
+    def __init__(self, user_id, metrics):
+        self.user_id = user_id
+        self.metrics = metrics
+        self.handlers = {}
+        self.pending = {}
+        self.next_ref = 0
+        self.reader = self.writer = self.listener = None
+
+    async def connect(self, host, port, role):
+        self.reader, self.writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+        self.listener = asyncio.create_task(self.listen())
+        await self.call("auth", "auth", user_id=self.user_id, role=role)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+        if self.listener:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+
+    async def listen(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if "ref" in message:
+                    future = self.pending.pop(message["ref"], None)
+                    if future and not future.done():
+                        future.set_result(message)
+                    continue
+                handler = self.handlers.get(message.get("topic"))
+                if handler:
+                    self.metrics.last_activity = time.perf_counter()
+                    self.metrics.counters["events_received"] += 1
+                    handler(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+
+    async def call(self, label, op, **fields):
+        """Send one request and record its round trip under `label`."""
+        self.next_ref += 1
+        ref = self.next_ref
+        future = asyncio.get_running_loop().create_future()
+        self.pending[ref] = future
+        started = time.perf_counter()
+        self.writer.write((json.dumps({"ref": ref, "op": op, **fields}) + "\n").encode())
+        reply = await future
+        self.metrics.last_activity = time.perf_counter()
+        self.metrics.latencies[label].append(self.metrics.last_activity - started)
+        if "error" in reply:
+            self.metrics.errors[label] += 1
+            raise DatabaseError(reply["error"]["code"], reply["error"]["message"])
+        return reply["data"]
+
+    async def channel(self, topic, table, event, handler, filter_spec=None):
+        self.handlers[topic] = handler
+        await self.call("subscribe", "subscribe", topic=topic, table=table, event=event, filter=filter_spec)
+
+    async def remove_channel(self, topic):
+        self.handlers.pop(topic, None)
+        await self.call("unsubscribe", "unsubscribe", topic=topic)
+
+
+class SimulatedUser:
+    """One signed-in user following the App.tsx / MessagesModal flows."""
+
+    def __init__(self, user_id, contacts, args, metrics, rng):
+        self.user_id = user_id
+        self.contacts = contacts
+        self.args = args
+        self.metrics = metrics
+        self.rng = rng
+        self.role = "employer" if rng.random() < EMPLOYER_SHARE else "job_seeker"
+        self.client = RealtimeClient(user_id, metrics)
+        self.conversations = {}
+        self.active_conversation = None
+        self.background = set()
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(self.guard(coroutine))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def guard(self, coroutine):
+        try:
+            await coroutine
+        except (DatabaseError, ConnectionError):
+            pass
+
+    def record_delivery(self, kind, message):
+        self.metrics.deliveries[kind].append(time.monotonic() - message["commit_ts"])
+
+    async def connect(self, host, port):
+        await self.client.connect(host, port, self.role)
+        await self.client.channel("realtime-notifications", "notifications", "*",
+                                  self.on_notification, f"user_id=eq.{self.user_id}")
+        await self.client.channel("realtime-requests", "contact_requests", "*",
+                                  self.on_contact_request, f"target_user_id=eq.{self.user_id}")
+        if self.args.global_chat_channel:
+            await self.client.channel("realtime-chat-global", "messages", "INSERT", self.on_global_message)
+        await self.fetch_notifications()
+        await self.fetch_conversations()
+
+    # -- Realtime handlers -------------------------------------------------
+
+    def on_notification(self, message):
+        self.record_delivery("notification", message)
+        self.spawn(self.fetch_notifications())
+        record = message["new"]
+        if message["type"] == "INSERT" and record["type"] == "contact_request":
+            self.spawn(self.respond_to_request(record["related_id"]))
+
+    def on_contact_request(self, message):
+        self.spawn(self.fetch_notifications())
+
+    def on_global_message(self, message):
+        if message["new"]["sender_id"] != self.user_id:
+            self.record_delivery("message_global", message)
+            self.spawn(self.fetch_conversations())
+
+    def on_chat_message(self, message):
+        if message["new"]["sender_id"] != self.user_id:
+            self.record_delivery("message_chat", message)
+            self.spawn(self.mark_messages_as_read(message["new"]["conversation_id"]))
+
+    # -- Frontend flows ----------------------------------------------------
+
+    async def fetch_conversations(self):
+        """App.tsx fetchConversations: list, last_message backfill, names, unread count."""
+        started = time.perf_counter()
+        rows = await self.client.call("select_conversations", "select", table="conversations",
+                                      participant=self.user_id, order="last_message_at", desc=True)
+        # One query per conversation without last_message. The last_message
+        # update never lands (no UPDATE policy), so this hits every conversation.
+        await asyncio.gather(*(
+            self.client.call("backfill_last_message", "select", table="messages",
+                             eq={"conversation_id": row["id"]}, order="created_at", desc=True, limit=1)
+            for row in rows if not row["last_message"]))
+
+        participant_ids = set()
+        for row in rows:
+            participant_ids.update((row["participant1_id"], row["participant2_id"]))
+            other = row["participant2_id"] if row["participant1_id"] == self.user_id else row["participant1_id"]
+            self.conversations.setdefault(other, row["id"])
+        if participant_ids:
+            ids = sorted(participant_ids)
+            await self.client.call("select_profiles", "select", table="profiles", **{"in": {"id": ids}})
+            for table in ("cvs", "companies", "shops"):
+                await self.client.call(f"select_{table}", "select", table=table, **{"in": {"user_id": ids}})
+
+        await self.client.call("count_unread_messages", "select", table="messages",
+                               eq={"is_read": False}, neq={"sender_id": self.user_id}, count=True)
+        self.metrics.flows["fetch_conversations"].append(time.perf_counter() - started)
+
+    async def fetch_notifications(self):
+        """App.tsx fetchGeneralNotifications: list, request statuses, sender names."""
+        started = time.perf_counter()
+        rows = await self.client.call("select_notifications", "select", table="notifications",
+                                      eq={"user_id": self.user_id, "is_visible": True},
+                                      order="created_at", desc=True, limit=50)
+        if rows:
+            # The frontend looks for 'contact_request_received' while the trigger
+            # writes 'contact_request', so this lookup is normally skipped.
+            request_ids = [row["related_id"] for row in rows
+                           if row["type"] == "contact_request_received" and row.get("related_id")]
+            if request_ids:
+                await self.client.call("select_contact_requests", "select", table="contact_requests",
+                                       **{"in": {"id": request_ids}})
+            sender_ids = sorted({row["sender_id"] for row in rows if row.get("sender_id")})
+            if sender_ids:
+                for table in ("companies", "cvs"):
+                    await self.client.call(f"select_{table}", "select", table=table,
+                                           **{"in": {"user_id": sender_ids}})
+        self.metrics.flows["fetch_notifications"].append(time.perf_counter() - started)
+
+    async def respond_to_request(self, request_id):
+        await self.client.call("respond_to_request", "update", table="contact_requests",
+                               eq={"id": request_id, "status": "pending"}, values={"status": "approved"})
+
+    async def mark_messages_as_read(self, conversation_id):
+        await self.client.call("mark_as_read", "update", table="messages",
+                               eq={"conversation_id": conversation_id, "is_read": False},
+                               neq={"sender_id": self.user_id}, values={"is_read": True})
+        # onRefreshConversations() is not awaited by MessagesModal.
+        self.spawn(self.fetch_conversations())
+
+    async def open_chat(self, target_user_id):
+        conversation_id = self.conversations.get(target_user_id)
+        if conversation_id is None:
+            started = time.perf_counter()
+            try:
+                row = await self.client.call("insert_conversation", "insert", table="conversations",
+                                             values={"participant1_id": self.user_id,
+                                                     "participant2_id": target_user_id})
+            except DatabaseError as error:
+                if error.code != "23505":
+                    raise
+                rows = await self.client.call("select_conversation", "select", table="conversations",
+                                              participant=target_user_id)
+                row = rows[0]
+            await self.fetch_conversations()
+            conversation_id = self.conversations[target_user_id] = row["id"]
+            self.metrics.flows["open_chat"].append(time.perf_counter() - started)
+
+        if self.active_conversation != conversation_id:
+            if self.active_conversation:
+                await self.client.remove_channel(f"chat:{self.active_conversation}")
+            self.active_conversation = conversation_id
+            await self.client.call("fetch_messages", "select", table="messages",
+                                   eq={"conversation_id": conversation_id})
+            await self.mark_messages_as_read(conversation_id)
+            await self.client.channel(f"chat:{conversation_id}", "messages", "INSERT",
+                                      self.on_chat_message, f"conversation_id=eq.{conversation_id}")
+        return conversation_id
+
+    async def send_message(self, conversation_id):
+        content = "Merhaba, ilanınız hakkında görüşmek isterim. #" + str(self.metrics.counters["messages_sent"])
+        started = time.perf_counter()
+        await self.client.call("insert_message", "insert", table="messages",
+                               values={"conversation_id": conversation_id, "sender_id": self.user_id,
+                                       "content": content})
+        await self.client.call("update_conversation", "update", table="conversations",
+                               eq={"id": conversation_id},
+                               values={"last_message": content, "last_message_at": now_iso()})
+        self.metrics.flows["send_message"].append(time.perf_counter() - started)
+        self.metrics.counters["messages_sent"] += 1
+        self.spawn(self.fetch_conversations())
+
+    async def send_contact_request(self, target_user_id):
+        try:
+            await self.client.call("insert_contact_request", "insert", table="contact_requests",
+                                   values={"requester_id": self.user_id, "target_user_id": target_user_id})
+        except DatabaseError as error:
+            # A repeat request hits unique(requester_id, target_user_id); the
+            # call already counted it as an error and the user keeps chatting.
+            if error.code != "23505":
+                raise
+            return
+        self.metrics.counters["contact_requests_sent"] += 1
+
+    async def run(self, start):
+        await start.wait()
+        for _ in range(self.args.messages):
+            await asyncio.sleep(self.rng.expovariate(1000.0 / self.args.think_ms))
+            target = self.rng.choice(self.contacts)
+            try:
+                if self.rng.random() < self.args.contact_request_ratio:
+                    await self.send_contact_request(target)
+                conversation_id = await self.open_chat(target)
+                await self.send_message(conversation_id)
+            except (DatabaseError, ConnectionError):
+                self.metrics.counters["failed_iterations"] += 1
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def raise_fd_limit():
+    """Allow two sockets per simulated user (client and server side)."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # macOS reports RLIM_INFINITY as the hard limit but rejects it as a soft one.
+    target = FD_LIMIT if hard == resource.RLIM_INFINITY else min(hard, FD_LIMIT)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def build_users(args, metrics):
+    rng = random.Random(args.seed)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.users)]
+    users = []
+    wanted = min(args.conversations, len(user_ids) - 1)
+    for index, user_id in enumerate(user_ids):
+        contacts = [other for other in rng.sample(user_ids, wanted + 1) if other != user_id][:wanted]
+        users.append(SimulatedUser(user_id, contacts, args, metrics, random.Random(args.seed * 1_000_003 + index)))
+    return users
+
+
+async def settle(users, metrics, timeout):
+    """Wait until no refetch is pending and realtime traffic has gone quiet.
+
+    Gives up after `timeout` seconds, cancels whatever is still running so it
+    cannot leak into later measurements, and returns how many were cancelled.
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        pending = [task for user in users for task in user.background]
+        if remaining <= 0:
+            break
+        if pending:
+            await asyncio.wait(pending, timeout=remaining)
+        elif time.perf_counter() - metrics.last_activity >= SETTLE_QUIET_SECONDS:
+            return 0
+        else:
+            await asyncio.sleep(min(SETTLE_QUIET_SECONDS / 5, remaining))
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return len(pending)
+
+
+async def control_call(host, port, op):
+    reader, writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+    writer.write((json.dumps({"ref": 0, "op": op}) + "\n").encode())
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply.get("data")
+
+
+async def simulate(args):
+    raise_fd_limit()
+    server = None
+    if args.server:
+        host, _, port = args.server.rpartition(":")
+        port = int(port)
+    else:
+        server = await StandInServer(args.server_delay_ms).start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+    await control_call(host, port, "reset")
+
+    metrics = Metrics()
+    users = build_users(args, metrics)
+
+    connect_started = time.perf_counter()
+    gate = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(user):
+        async with gate:
+            started = time.perf_counter()
+            await user.connect(host, port)
+            metrics.flows["connect"].append(time.perf_counter() - started)
+
+    await asyncio.gather(*(connect(user) for user in users))
+    connect_seconds = time.perf_counter() - connect_started
+    unsettled = {"connect": await settle(users, metrics, args.drain_seconds)}
+    # Only the run phase counts towards latencies and throughput.
+    connect_latencies = metrics.flows["connect"]
+    metrics.reset()
+    metrics.flows["connect"] = connect_latencies
+
+    start = asyncio.Event()
+    tasks = [asyncio.create_task(user.run(start)) for user in users]
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    unsettled["run"] = await settle(users, metrics, args.drain_seconds)
+    elapsed = max(metrics.last_activity - started, 1e-9)
+
+    server_stats = await control_call(host, port, "stats")
+    for user in users:
+        await user.client.close()
+    if server:
+        server.close()
+        await server.wait_closed()
+
+    return build_report(args, metrics, server_stats, elapsed, connect_seconds, unsettled)
+
+
+def build_report(args, metrics, server_stats, elapsed, connect_seconds, unsettled):
+    total_requests = sum(len(values) for values in metrics.latencies.values())
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare", "serve")},
+        "duration_seconds": round(elapsed, 3),
+        "connect_seconds": round(connect_seconds, 3),
+        # Background refetches cancelled when --drain-seconds ran out, per phase.
+        "unsettled_tasks": unsettled,
+        "throughput": {
+            "messages_per_second": round(metrics.counters["messages_sent"] / elapsed, 2),
+            "requests_per_second": round(total_requests / elapsed, 2),
+            "events_received_per_second": round(metrics.counters["events_received"] / elapsed, 2),
+        },
+        "counters": dict(metrics.counters),
+        "errors": dict(metrics.errors),
+        "flow_latency_ms": {label: summarize(values) for label, values in sorted(metrics.flows.items())},
+        "latency_ms": {label: summarize(values) for label, values in sorted(metrics.latencies.items())},
+        "delivery_latency_ms": {kind: summarize(values) for kind, values in sorted(metrics.deliveries.items())},
+        "server": server_stats,
+    }
+
+
+def print_report(report):
+    print(f"users={report['config']['users']} duration={report['duration_seconds']}s "
+          f"connect={report['connect_seconds']}s")
+    for key, value in report["throughput"].items():
+        print(f"  {key:<28} {value}")
+
+    def table(title, rows):
+        print(f"\n{title:<26} {'count':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+        for label, row in rows.items():
+            if row["count"]:
+                print(f"  {label:<24} {row['count']:>8} {row['p50']:>9} {row['p95']:>9} "
+                      f"{row['p99']:>9} {row['max']:>9}")
+
+    table("flow latency (ms)", report["flow_latency_ms"])
+    table("request latency (ms)", report["latency_ms"])
+    table("delivery latency (ms)", report["delivery_latency_ms"])
+
+    print(f"\n{'fan-out per event':<26} {'events':>8} {'checks':>9} {'delivered':>9} "
+          f"{'bytes':>9} {'us p50':>9} {'us p99':>9}")
+    for key, row in report["server"]["fanout"].items():
+        us = row["fanout_us_per_event"]
+        print(f"  {key:<24} {row['events']:>8} {row['authorization_checks_per_event']['mean']:>9} "
+              f"{row['deliveries_per_event']['mean']:>9} {row['bytes_per_event']['mean']:>9} "
+              f"{us['p50']:>9} {us['p99']:>9}")
+
+    if report["errors"]:
+        print(f"\nerrors: {report['errors']}")
+    if any(report["unsettled_tasks"].values()):
+        print(f"\nrefetches cancelled after --drain-seconds: {report['unsettled_tasks']}")
+
+
+def print_comparison(report, baseline):
+    """Print relative change of the headline numbers against a previous run."""
+    def delta(new, old):
+        if not old or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\ncompared with baseline (users={baseline['config']['users']})")
+    config, old_config = report["config"], baseline.get("config", {})
+    for key in sorted(set(config) | set(old_config)):
+        if config.get(key) != old_config.get(key):
+            print(f"  config differs: {key} {old_config.get(key)!r} -> {config.get(key)!r}")
+    for key, value in report["throughput"].items():
+        print(f"  {key:<36} {value:>10} {delta(value, baseline['throughput'].get(key))}")
+    for section in ("flow_latency_ms", "latency_ms", "delivery_latency_ms"):
+        for label, row in report[section].items():
+            old = baseline.get(section, {}).get(label, {})
+            for pct in ("p95", "p99"):
+                if pct in row:
+                    print(f"  {label + ' ' + pct:<36} {row[pct]:>10} {delta(row[pct], old.get(pct))}")
+    for key, row in report["server"]["fanout"].items():
+        old = baseline["server"]["fanout"].get(key, {})
+        for metric, label in (("authorization_checks_per_event", "checks mean"),
+                              ("deliveries_per_event", "delivered mean"),
+                              ("fanout_us_per_event", "fan-out us p99")):
+            stat = "p99" if metric == "fanout_us_per_event" else "mean"
+            new_value = row[metric].get(stat)
+            old_value = old.get(metric, {}).get(stat)
+            print(f"  {key + ' ' + label:<36} {new_value:>10} {delta(new_value, old_value)}")
+
+async def serve(args):
+    raise_fd_limit()
+    server = await StandInServer(args.server_delay_ms).start(args.host, args.port)
+    print(f"stand-in server listening on {args.host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="concurrent simulated users")
+    parser.add_argument("--messages", type=int, default=10, help="messages sent per user")
+    parser.add_argument("--conversations", type=int, default=3, help="distinct chat partners per user")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="mean pause between user actions")
+    parser.add_argument("--contact-request-ratio", type=float, default=0.1,
+                        help="share of iterations that also send a contact request")
+    parser.add_argument("--no-global-chat-channel", dest="global_chat_channel", action="store_false",
+                        help="skip the unfiltered realtime-chat-global subscription from App.tsx")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--drain-seconds", type=float, default=5.0,
+                        help="maximum wait for in-flight realtime events and refetches after a phase; "
+                             "refetches still running after that are cancelled and reported")
+    parser.add_argument("--server-delay-ms", type=float, default=0.0,
+                        help="artificial per-request latency added by the stand-in server")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server", help="HOST:PORT of an already running stand-in server")
+    parser.add_argument("--serve", action="store_true", help="only run the stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report JSON to compare against")
+    args = parser.parse_args(argv)
+    if args.users < 2:
+        parser.error("--users must be at least 2")
+    if args.messages < 0:
+        parser.error("--messages must not be negative")
+    if args.conversations < 1:
+        parser.error("--conversations must be at least 1")
+    if args.think_ms <= 0:
+        parser.error("--think-ms must be positive")
+    if not 0 <= args.contact_request_ratio <= 1:
+        parser.error("--contact-request-ratio must be between 0 and 1")
+    if args.connect_concurrency < 1:
+        parser.error("--connect-concurrency must be at least 1")
+    if args.drain_seconds < 0:
+        parser.error("--drain-seconds must not be negative")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    report = asyncio.run(simulate(args))
+    print_report(report)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(report, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nreport written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())